@@ -0,0 +1,278 @@
+import math
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from models.enums import VehicleState
+
+
+class SpeedSketch:
+    """
+    Mergeable quantile sketch with bounded relative error.
+
+    Values are counted in logarithmically sized bins, so memory depends only on
+    the range of speeds seen (about 175 bins from 1 to 1000 km/h at 2%
+    accuracy), and two sketches with the same accuracy merge by adding counts.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.02, min_value: float = 1.0):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value  # values below this count as zero
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        """Add a single value to the sketch."""
+        self.count += 1
+        if value < self.min_value:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+
+    def merge(self, other: "SpeedSketch") -> None:
+        """Add the counts of another sketch with the same accuracy."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile (0 <= q <= 1), or None for an empty sketch."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return 2 * self.gamma**key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "bins": {str(k): v for k, v in self.bins.items()},
+            "zero_count": self.zero_count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SpeedSketch":
+        sketch = cls(data["relative_accuracy"], data["min_value"])
+        sketch.bins = {int(k): v for k, v in data["bins"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = sketch.zero_count + sum(sketch.bins.values())
+        return sketch
+
+
+@dataclass
+class TrafficRollup:
+    """Aggregates of the tracks finalized within one time bucket."""
+
+    bucket_start: float
+    bucket_seconds: float
+    vehicle_counts: Dict[str, int] = field(default_factory=dict)
+    state_counts: Dict[str, int] = field(default_factory=dict)
+    speeds: SpeedSketch = field(default_factory=SpeedSketch)
+    direction_sin: float = 0.0
+    direction_cos: float = 0.0
+    direction_count: int = 0
+
+    def merge(self, other: "TrafficRollup") -> None:
+        """Add the aggregates of another rollup of the same bucket."""
+        for cls_name, count in other.vehicle_counts.items():
+            self.vehicle_counts[cls_name] = self.vehicle_counts.get(cls_name, 0) + count
+        for state, count in other.state_counts.items():
+            self.state_counts[state] = self.state_counts.get(state, 0) + count
+        self.speeds.merge(other.speeds)
+        self.direction_sin += other.direction_sin
+        self.direction_cos += other.direction_cos
+        self.direction_count += other.direction_count
+
+    def mean_direction(self) -> Optional[float]:
+        """Circular mean of the track directions in radians."""
+        if self.direction_count == 0:
+            return None
+        return math.atan2(self.direction_sin, self.direction_cos)
+
+    def to_dict(self) -> Dict[str, Any]:
+        per_minute = 60.0 / self.bucket_seconds
+        return {
+            "bucket_start": self.bucket_start,
+            "bucket_seconds": self.bucket_seconds,
+            "vehicle_counts": self.vehicle_counts,
+            "vehicles_per_minute": {
+                cls_name: count * per_minute
+                for cls_name, count in self.vehicle_counts.items()
+            },
+            "state_counts": self.state_counts,
+            "speed_percentiles": {
+                f"p{int(q * 100)}": self.speeds.quantile(q) for q in (0.5, 0.85, 0.95)
+            },
+            "mean_direction": self.mean_direction(),
+            "speeds": self.speeds.to_dict(),
+            "direction_sin": self.direction_sin,
+            "direction_cos": self.direction_cos,
+            "direction_count": self.direction_count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TrafficRollup":
+        return cls(
+            bucket_start=data["bucket_start"],
+            bucket_seconds=data["bucket_seconds"],
+            vehicle_counts=dict(data["vehicle_counts"]),
+            state_counts=dict(data["state_counts"]),
+            speeds=SpeedSketch.from_dict(data["speeds"]),
+            direction_sin=data["direction_sin"],
+            direction_cos=data["direction_cos"],
+            direction_count=data["direction_count"],
+        )
+
+
+def merge_rollups(rollups: Iterable[TrafficRollup]) -> List[TrafficRollup]:
+    """
+    Merge rollups from parallel workers or cameras into one rollup per bucket.
+
+    Rollups are matched on `bucket_start`, so workers must share the same
+    bucket size and time base. The inputs are left unchanged.
+    """
+    merged: Dict[float, TrafficRollup] = {}
+    for rollup in rollups:
+        target = merged.get(rollup.bucket_start)
+        if target is None:
+            target = merged[rollup.bucket_start] = TrafficRollup(
+                rollup.bucket_start,
+                rollup.bucket_seconds,
+                speeds=SpeedSketch(
+                    rollup.speeds.relative_accuracy, rollup.speeds.min_value
+                ),
+            )
+        target.merge(rollup)
+    return [merged[start] for start in sorted(merged)]
+
+
+class TrafficAggregator:
+    """
+    Streaming aggregation of finalized tracks into fixed-size time buckets.
+
+    A track is finalized once it has not been seen for `track_timeout_frames`
+    frames and is counted in the bucket of its last appearance, with its class,
+    last state, mean speed and last direction. A bucket is emitted through
+    `on_rollup` as soon as no more tracks can be finalized into it. Memory is
+    bounded by the number of active tracks and open buckets.
+    """
+
+    DEFAULT_FPS = 30.0
+
+    def __init__(
+        self,
+        bucket_seconds: float,
+        fps: float,
+        track_timeout_frames: int = 30,
+        start_time: float = 0.0,
+        on_rollup: Optional[Callable[[TrafficRollup], None]] = None,
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.fps = fps or self.DEFAULT_FPS  # some containers report 0 fps
+        self.track_timeout_frames = track_timeout_frames
+        self.start_time = start_time  # time base shared by merged workers/cameras
+        self.on_rollup = on_rollup
+        self.tracks: Dict[int, Dict[str, Any]] = {}
+        self.buckets: Dict[int, TrafficRollup] = {}
+
+    def __getstate__(self):
+        # The rollup callback is process-specific and is re-attached on resume
+        state = self.__dict__.copy()
+        state["on_rollup"] = None
+        return state
+
+    def _bucket_index(self, frame_idx: int) -> int:
+        return math.floor(
+            (self.start_time + frame_idx / self.fps) / self.bucket_seconds
+        )
+
+    def update_track(self, track_id: int, cls_name: str, frame_idx: int) -> None:
+        """Mark a track as seen in the given frame."""
+        summary = self.tracks.get(track_id)
+        if summary is None:
+            self.tracks[track_id] = {
+                "cls": cls_name,
+                "last_frame": frame_idx,
+                "speed_sum": 0.0,
+                "speed_count": 0,
+                "state": None,
+                "direction": None,
+            }
+        else:
+            summary["last_frame"] = frame_idx
+
+    def record_measurement(
+        self, track_id: int, speed: float, state: VehicleState, direction: float
+    ) -> None:
+        """Record a speed, state and direction update of an active track."""
+        summary = self.tracks.get(track_id)
+        if summary is None:
+            return
+        summary["speed_sum"] += speed
+        summary["speed_count"] += 1
+        summary["state"] = state
+        summary["direction"] = direction
+
+    def step(self, frame_idx: int) -> None:
+        """Finalize tracks that timed out and emit buckets that can no longer change."""
+        cutoff = frame_idx - self.track_timeout_frames
+        stale = [
+            track_id
+            for track_id, summary in self.tracks.items()
+            if summary["last_frame"] < cutoff
+        ]
+        for track_id in stale:
+            self._finalize(self.tracks.pop(track_id))
+
+        if self.buckets:
+            closed_before = self._bucket_index(max(cutoff, 0))
+            for bucket_idx in sorted(self.buckets):
+                if bucket_idx >= closed_before:
+                    break
+                self._emit(bucket_idx)
+
+    def flush(self) -> None:
+        """Finalize all active tracks and emit every open bucket."""
+        for summary in self.tracks.values():
+            self._finalize(summary)
+        self.tracks.clear()
+        for bucket_idx in sorted(self.buckets):
+            self._emit(bucket_idx)
+
+    def _finalize(self, summary: Dict[str, Any]) -> None:
+        bucket_idx = self._bucket_index(summary["last_frame"])
+        rollup = self.buckets.get(bucket_idx)
+        if rollup is None:
+            rollup = self.buckets[bucket_idx] = TrafficRollup(
+                bucket_idx * self.bucket_seconds, self.bucket_seconds
+            )
+
+        cls_name = summary["cls"]
+        rollup.vehicle_counts[cls_name] = rollup.vehicle_counts.get(cls_name, 0) + 1
+        state = summary["state"]
+        state_name = state.name if isinstance(state, VehicleState) else "UNKNOWN"
+        rollup.state_counts[state_name] = rollup.state_counts.get(state_name, 0) + 1
+        if summary["speed_count"]:
+            rollup.speeds.add(summary["speed_sum"] / summary["speed_count"])
+        if summary["direction"] is not None:
+            rollup.direction_sin += math.sin(summary["direction"])
+            rollup.direction_cos += math.cos(summary["direction"])
+            rollup.direction_count += 1
+
+    def _emit(self, bucket_idx: int) -> None:
+        rollup = self.buckets.pop(bucket_idx)
+        if self.on_rollup:
+            self.on_rollup(rollup)
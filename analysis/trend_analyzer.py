@@ -1,6 +1,5 @@
 from typing import List
 import numpy as np
-from scipy.stats import linregress
 from models.enums import VehicleState
 from config.config_handler import DetectorConfig
 
@@ -15,6 +14,8 @@ class TrendAnalyzer:
             return VehicleState.UNKNOWN
 
         if config.analysis_method == "linreg":
+            from scipy.stats import linregress  # Deferred: scipy is slow to import
+
             x = np.arange(len(speeds))
             slope, _, r_value, _, _ = linregress(x, speeds)
             speed = np.mean(speeds)
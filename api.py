@@ -1,10 +1,29 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import (
+    FastAPI,
+    File,
+    UploadFile,
+    HTTPException,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from core.video_processor import process_video
 from config.config_handler import DetectorConfig
+from utils.metrics import REGISTRY, Counter, Gauge, directory_size
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from time import time
+import asyncio
+import base64
+import errno
+import io
+import numpy as np
 import os
 import shutil
 import tempfile
+import threading
 import uuid
 
 app = FastAPI(title="Traffic analyzer")
@@ -12,45 +31,502 @@ app = FastAPI(title="Traffic analyzer")
 PROCESSED_DIR = "processed"
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # bytes read from the upload per iteration
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # bytes sent to the client per iteration
+
+# Containers that can be decoded from a non-seekable stream, so processing
+# can start on the leading part of the upload while the rest still arrives.
+STREAMABLE_SUFFIXES = {".ts", ".mts"}
+# Container extensions accepted for uploads, used in temp and output filenames
+ALLOWED_SUFFIXES = {".mp4", ".avi", ".mov", ".mkv", ".flv", ".ts", ".mts"}
+
+LIVE_QUEUE_SIZE = 64  # messages buffered per live client before processing waits
+PREVIEW_JPEG_QUALITY = 70
+LIVE_JOB_TTL = 600  # seconds an uploaded live job waits for a client
+MAX_CONCURRENT_JOBS = 2  # each job loads its own detector model
+
+# Bounds the detectors loaded at once; further jobs wait for a free slot
+JOB_SLOTS = asyncio.Semaphore(MAX_CONCURRENT_JOBS)
+
+# Uploaded videos waiting for a live results client, keyed by job id
+live_jobs: Dict[str, str] = {}
+
+JOBS_TOTAL = REGISTRY.register(
+    Counter("traffic_jobs_total", "Finished processing jobs.", label="status")
+)
+JOBS_QUEUED = REGISTRY.register(
+    Gauge("traffic_jobs_queued", "Jobs waiting for a free processing slot.")
+)
+UPLOADS_IN_PROGRESS = REGISTRY.register(
+    Gauge("traffic_uploads_in_progress", "Uploads being received to a file.")
+)
+REGISTRY.register(
+    Gauge(
+        "traffic_live_jobs_pending",
+        "Uploaded live jobs waiting for a WebSocket client.",
+        func=lambda: len(live_jobs),
+    )
+)
+JOBS_IN_FLIGHT = REGISTRY.register(
+    Gauge("traffic_jobs_in_flight", "Jobs currently being processed.")
+)
+REGISTRY.register(
+    Gauge(
+        "traffic_processed_dir_bytes",
+        "Total size of the processed-output directory.",
+        func=lambda: directory_size(PROCESSED_DIR),
+    )
+)
+
+
+@contextmanager
+def job_metrics():
+    """Count a processing job as in flight and record how it finished."""
+    JOBS_IN_FLIGHT.inc()
+    try:
+        yield
+        JOBS_TOTAL.inc(label_value="completed")
+    except Exception:
+        JOBS_TOTAL.inc(label_value="failed")
+        raise
+    finally:
+        JOBS_IN_FLIGHT.dec()
+
+
+@asynccontextmanager
+async def job_slot():
+    """Wait for a free processing slot and count the job while it runs."""
+    JOBS_QUEUED.inc()
+    try:
+        await JOB_SLOTS.acquire()
+    finally:
+        JOBS_QUEUED.dec()
+    try:
+        with job_metrics():
+            yield
+    finally:
+        JOB_SLOTS.release()
+
+
+def spooled_upload_path(file: UploadFile) -> Optional[str]:
+    """
+    Path under which an already received multipart upload can be opened.
+
+    Starlette spools multipart uploads to an anonymous temporary file before
+    the handler runs. On Linux that file is reopened through /proc, so it is
+    processed without copying it again. Returns None where that is not possible.
+    """
+    try:
+        fd = file.file.fileno()  # Rolls a small in-memory upload over to disk
+        file.file.flush()
+    except (OSError, io.UnsupportedOperation):
+        return None
+    path = f"/proc/self/fd/{fd}"
+    return path if os.path.exists(path) else None
+
+
+def copy_upload(file: UploadFile, suffix: str) -> str:
+    """Copy a received multipart upload to a temporary file and return its path."""
+    file.file.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        shutil.copyfileobj(file.file, tmp, UPLOAD_CHUNK_SIZE)
+        return tmp.name
+
+
+async def save_chunks(chunks: AsyncIterator[bytes], suffix: str) -> str:
+    """Write incoming chunks to a temporary file and return its path."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        async for chunk in chunks:
+            await run_in_threadpool(tmp.write, chunk)
+        return tmp.name
+
+
+async def open_fifo_writer(fifo_path: str, reader: asyncio.Future) -> Optional[int]:
+    """
+    Open the write end of a FIFO once the video reader has opened the other end.
+
+    Returns None if the reader finished (e.g. failed to open the stream) before
+    ever attaching, so the caller does not block forever.
+    """
+    while not reader.done():
+        try:
+            return os.open(fifo_path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            if e.errno != errno.ENXIO:
+                raise
+            await asyncio.sleep(0.05)
+    return None
+
+
+def unblock_fifo_reader(fifo_path: str) -> None:
+    """
+    Release a reader blocked on opening a FIFO that no writer will open.
+
+    Opening and closing a read-write end lets the pending open complete, after
+    which the reader sees end of stream.
+    """
+    try:
+        os.close(os.open(fifo_path, os.O_RDWR | os.O_NONBLOCK))
+    except OSError:
+        pass
+
+
+async def process_streaming(
+    chunks: AsyncIterator[bytes], suffix: str, config: DetectorConfig, output_path: str
+) -> None:
+    """
+    Process a streamable upload while it is still being received.
+
+    Chunks are piped through a FIFO into process_video, so decoding starts on
+    the first bytes and only one chunk is held in memory at a time.
+    """
+    tmp_dir = tempfile.mkdtemp()
+    fifo_path = os.path.join(tmp_dir, f"upload{suffix}")
+    os.mkfifo(fifo_path)
+    stop_event = threading.Event()
+    reader = asyncio.ensure_future(
+        run_in_threadpool(
+            process_video,
+            video_path=fifo_path,
+            config=config,
+            output_path=output_path,
+            on_frame=lambda *_: stop_event.is_set(),
+        )
+    )
+    try:
+        fd = await open_fifo_writer(fifo_path, reader)
+        if fd is not None:
+            os.set_blocking(fd, True)
+            with os.fdopen(fd, "wb") as fifo:
+                try:
+                    async for chunk in chunks:
+                        await run_in_threadpool(fifo.write, chunk)
+                except BrokenPipeError:
+                    pass  # Reader stopped early, the rest of the upload is not needed
+        await reader
+    finally:
+        if not reader.done():
+            # Receiving the upload failed: stop the reader at its next frame and
+            # wait for it, so the FIFO is not removed while it is still in use
+            stop_event.set()
+            unblock_fifo_reader(fifo_path)
+            await asyncio.gather(reader, return_exceptions=True)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def validate_suffix(suffix: str) -> str:
+    """Return the normalized container suffix or reject unsupported ones."""
+    suffix = suffix.lower()
+    if not suffix.startswith("."):
+        suffix = f".{suffix}"
+    if suffix not in ALLOWED_SUFFIXES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported video format, expected one of: "
+            f"{', '.join(sorted(ALLOWED_SUFFIXES))}",
+        )
+    return suffix
+
+
+def new_job(suffix: str) -> Tuple[str, DetectorConfig]:
+    """Output filename and detector configuration of an API processing job."""
+    config = DetectorConfig()
+    config.show = False
+    config.draw_direction = True
+    return f"{uuid.uuid4()}{suffix}", config
+
+
+async def process_file(video_path: str, suffix: str) -> str:
+    """Process a video file once a slot is free and return its download URL."""
+    output_filename, config = new_job(suffix)
+    async with job_slot():
+        await run_in_threadpool(
+            process_video,
+            video_path=video_path,
+            config=config,
+            output_path=os.path.join(PROCESSED_DIR, output_filename),
+        )
+    return f"/download/{output_filename}"
+
+
+async def process_upload(chunks: AsyncIterator[bytes], suffix: str) -> str:
+    """Process a video received as a stream of chunks and return its download URL."""
+    if suffix in STREAMABLE_SUFFIXES and hasattr(os, "mkfifo"):
+        output_filename, config = new_job(suffix)
+        async with job_slot():
+            await process_streaming(
+                chunks, suffix, config, os.path.join(PROCESSED_DIR, output_filename)
+            )
+        return f"/download/{output_filename}"
+
+    UPLOADS_IN_PROGRESS.inc()
+    try:
+        tmp_path = await save_chunks(chunks, suffix)
+    finally:
+        UPLOADS_IN_PROGRESS.dec()
+    try:
+        return await process_file(tmp_path, suffix)
+    finally:
+        os.remove(tmp_path)  # Delete the temporary file after processing
+
 
 @app.post("/process_video")
 async def process_video_endpoint(file: UploadFile = File(...)):
     """Endpoint to upload, process, and return a video."""
+    suffix = validate_suffix(os.path.splitext(file.filename)[1])
     try:
-        # 1. Create a temporary file
-        with tempfile.NamedTemporaryFile(
-            delete=False, suffix=os.path.splitext(file.filename)[1]
-        ) as tmp:
-            tmp_path = tmp.name
-            shutil.copyfileobj(file.file, tmp)
-
-        # 2. Generate unique output filename
-        output_filename = f"{uuid.uuid4()}{os.path.splitext(file.filename)[1]}"
-        output_path = os.path.join(PROCESSED_DIR, output_filename)
+        # The multipart body has been received in full at this point
+        video_path = spooled_upload_path(file)
+        if video_path:
+            download_url = await process_file(video_path, suffix)
+        else:
+            tmp_path = await run_in_threadpool(copy_upload, file, suffix)
+            try:
+                download_url = await process_file(tmp_path, suffix)
+            finally:
+                os.remove(tmp_path)
+        return {"download_url": download_url, "message": "Video processed successfully"}
 
-        config = DetectorConfig()
-        config.show = False
-        config.draw_direction = True
-        process_video(video_path=tmp_path, config=config, output_path=output_path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")
 
-        os.remove(tmp_path)  # Delete the temporary file after processing
 
-        # 4. Create download URL
-        download_url = f"/download/{output_filename}"
+@app.post("/process_video/stream")
+async def process_video_stream_endpoint(request: Request, suffix: str = ".ts"):
+    """
+    Endpoint to process a video sent as the raw request body.
 
+    Unlike the multipart endpoint, the body is consumed as it arrives, so
+    streamable containers start processing before the upload has finished.
+    """
+    suffix = validate_suffix(suffix)
+    try:
+        download_url = await process_upload(request.stream(), suffix)
         return {"download_url": download_url, "message": "Video processed successfully"}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")
 
 
+@app.post("/live_jobs")
+async def create_live_job(file: UploadFile = File(...)):
+    """
+    Endpoint to upload a video for live results streaming.
+
+    Processing starts when a client connects to the returned WebSocket URL.
+    """
+    suffix = validate_suffix(os.path.splitext(file.filename)[1])
+    job_id = str(uuid.uuid4())
+    # Copied once, as the spooled upload is removed when the request ends
+    live_jobs[job_id] = await run_in_threadpool(copy_upload, file, suffix)
+    asyncio.get_running_loop().call_later(LIVE_JOB_TTL, expire_live_job, job_id)
+    return {
+        "job_id": job_id,
+        "websocket_url": f"/ws/live/{job_id}",
+        "expires_in": LIVE_JOB_TTL,
+    }
+
+
+def expire_live_job(job_id: str) -> None:
+    """Remove a live job whose client did not connect within LIVE_JOB_TTL."""
+    video_path = live_jobs.pop(job_id, None)
+    if video_path is None:
+        return  # A client already picked the job up
+    try:
+        os.remove(video_path)
+    except OSError:
+        pass
+
+
+def encode_preview(frame: np.ndarray, width: int) -> str:
+    """Downscale a frame to the given width and encode it as base64 JPEG."""
+    import cv2  # Deferred to keep API startup light
+
+    h, w = frame.shape[:2]
+    if w > width:
+        frame = cv2.resize(
+            frame, (width, int(h * width / w)), interpolation=cv2.INTER_AREA
+        )
+    _, jpeg = cv2.imencode(
+        ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_JPEG_QUALITY]
+    )
+    return base64.b64encode(jpeg.tobytes()).decode("ascii")
+
+
+@app.websocket("/ws/live/{job_id}")
+async def live_results_endpoint(
+    websocket: WebSocket,
+    job_id: str,
+    interval: int = 1,
+    preview: bool = False,
+    preview_fps: float = 2.0,
+    preview_width: int = 320,
+):
+    """
+    WebSocket endpoint that pushes track results while a video is processed.
+
+    A ``tracks`` message with ids, boxes, speeds, states and directions is sent
+    every `interval` frames. With `preview` enabled, ``preview`` messages with
+    downscaled JPEG frames are sent at most `preview_fps` times per second.
+    No output video is written. Processing stops when the client disconnects.
+    """
+    video_path = live_jobs.pop(job_id, None)
+    if video_path is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=LIVE_QUEUE_SIZE)
+    stop_event = threading.Event()
+    interval = max(interval, 1)
+    last_preview = 0.0
+    frames_processed = 0
+
+    def put(message: Optional[Dict[str, Any]]) -> None:
+        # Blocks the processing thread while the client lags behind
+        asyncio.run_coroutine_threadsafe(queue.put(message), loop).result()
+
+    def on_frame(frame_idx: int, frame: np.ndarray, detector) -> bool:
+        nonlocal last_preview, frames_processed
+        frames_processed = frame_idx + 1
+        if frame_idx % interval == 0:
+            put(
+                {
+                    "type": "tracks",
+                    "frame": frame_idx,
+                    "tracks": detector.get_track_results(),
+                }
+            )
+        if preview and time() - last_preview >= 1 / max(preview_fps, 1e-3):
+            last_preview = time()
+            put(
+                {
+                    "type": "preview",
+                    "frame": frame_idx,
+                    "jpeg": encode_preview(frame, preview_width),
+                }
+            )
+        return stop_event.is_set()
+
+    async def run() -> None:
+        config = DetectorConfig()
+        config.show = False
+        try:
+            async with job_slot():
+                await run_in_threadpool(
+                    process_video,
+                    video_path=video_path,
+                    config=config,
+                    on_frame=on_frame,
+                )
+            await queue.put({"type": "done", "frames": frames_processed})
+        except Exception as e:
+            await queue.put({"type": "error", "detail": str(e)})
+        finally:
+            await queue.put(None)
+
+    processing = asyncio.ensure_future(run())
+    finished = False
+    try:
+        while (message := await queue.get()) is not None:
+            await websocket.send_json(message)
+        finished = True
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stop_event.set()
+        # Drain so a processing thread blocked on a full queue can finish
+        while not finished:
+            finished = await queue.get() is None
+        await processing
+        os.remove(video_path)
+
+
+def parse_range_header(range_header: str, file_size: int) -> Tuple[int, int]:
+    """
+    Parse a single-range ``Range: bytes=start-end`` header.
+
+    Returns the inclusive (start, end) byte positions, raising a 416 error if
+    the range is malformed or cannot be satisfied.
+    """
+    unsatisfiable = HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{file_size}"},
+    )
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in ranges:
+        raise unsatisfiable
+
+    start_str, _, end_str = ranges.strip().partition("-")
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else file_size - 1
+        else:  # Suffix range: the last N bytes
+            start = max(file_size - int(end_str), 0)
+            end = file_size - 1
+    except ValueError:
+        raise unsatisfiable
+
+    end = min(end, file_size - 1)
+    if start > end:
+        raise unsatisfiable
+    return start, end
+
+
+def iter_file_range(file_path: str, start: int, end: int):
+    """Yield the inclusive byte range of a file in bounded-size chunks."""
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
 @app.get("/download/{filename}")
-async def download_file(filename: str):
-    """Endpoint to download a processed video."""
+async def download_file(filename: str, request: Request):
+    """Endpoint to download a processed video, with support for range requests."""
     file_path = os.path.join(PROCESSED_DIR, filename)
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(file_path, filename=filename, media_type="video/mp4")
+
+    range_header = request.headers.get("range")
+    if not range_header:
+        return FileResponse(
+            file_path,
+            filename=filename,
+            media_type="video/mp4",
+            headers={"Accept-Ranges": "bytes"},
+        )
+
+    file_size = os.path.getsize(file_path)
+    start, end = parse_range_header(range_header, file_size)
+    return StreamingResponse(
+        iter_file_range(file_path, start, end),
+        status_code=206,
+        media_type="video/mp4",
+        headers={
+            "Accept-Ranges": "bytes",
+            "Content-Range": f"bytes {start}-{end}/{file_size}",
+            "Content-Length": str(end - start + 1),
+            "Content-Disposition": f'attachment; filename="{filename}"',
+        },
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Endpoint exposing service metrics in the Prometheus text format."""
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 
 if __name__ == "__main__":
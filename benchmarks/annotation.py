@@ -0,0 +1,148 @@
+"""
+Annotation throughput benchmark: ultralytics Annotator path vs TrackRenderer.
+
+Synthetic tracks move across a blank frame; speeds and states are updated
+every `write_every_n_frames` frames like in DirectionDetector.
+
+Usage:
+    python benchmarks/annotation.py [--tracks 120] [--frames 200]
+        [--width 3840] [--height 2160] [--scale 0.5]
+"""
+
+import argparse
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ultralytics.utils.plotting import Annotator  # noqa: E402
+
+from config.config_handler import DetectorConfig  # noqa: E402
+from models.enums import VehicleState  # noqa: E402
+from utils.visualisations import TrackRenderer, draw_box_label  # noqa: E402
+
+NAMES = {0: "car", 1: "van", 2: "truck", 3: "bus"}
+STATES = list(VehicleState)
+
+
+class SyntheticTracks:
+    """Random boxes moving linearly, with per-track histories like the detector."""
+
+    def __init__(self, n_tracks: int, width: int, height: int, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.rng = rng
+        self.width, self.height = width, height
+        self.track_ids = list(range(1, n_tracks + 1))
+        self.clss = [float(c) for c in rng.integers(0, len(NAMES), n_tracks)]
+        self.sizes = rng.uniform(40, 160, (n_tracks, 2))
+        self.positions = rng.uniform(0, 1, (n_tracks, 2)) * (width, height)
+        self.velocities = rng.uniform(-8, 8, (n_tracks, 2))
+        self.speed = {}
+        self.baseline = {}
+        self.track_directions = {}
+        self.track_history = {track_id: [] for track_id in self.track_ids}
+
+    def step(self, frame_idx: int, write_every_n_frames: int) -> np.ndarray:
+        self.positions = (self.positions + self.velocities) % (self.width, self.height)
+        boxes = np.hstack(
+            [self.positions - self.sizes / 2, self.positions + self.sizes / 2]
+        )
+        for track_id, (cx, cy) in zip(self.track_ids, self.positions.tolist()):
+            history = self.track_history[track_id]
+            history.append((cx, cy))
+            if len(history) > 30:
+                history.pop(0)
+            if frame_idx % write_every_n_frames == write_every_n_frames - 1:
+                self.speed[track_id] = np.float32(self.rng.uniform(0, 120))
+                self.baseline[track_id] = STATES[track_id % len(STATES)]
+                self.track_directions[track_id] = float(self.rng.uniform(-np.pi, np.pi))
+        return boxes
+
+
+def run_annotator(config, tracks, frame, n_frames):
+    elapsed = 0.0
+    for frame_idx in range(n_frames):
+        boxes = tracks.step(frame_idx, config.write_every_n_frames)
+        im0 = frame.copy()
+        start = perf_counter()
+        annotator = Annotator(im0, line_width=config.line_width)
+        for box, track_id, cls in zip(boxes, tracks.track_ids, tracks.clss):
+            tracks.track_directions.setdefault(track_id, 0)
+            draw_box_label(
+                track_id,
+                box,
+                cls,
+                tracks.speed,
+                NAMES,
+                tracks.baseline,
+                annotator,
+                tracks.track_history[track_id],
+                tracks.track_directions,
+                config,
+            )
+        elapsed += perf_counter() - start
+    return n_frames / elapsed
+
+
+def run_renderer(config, tracks, frame, n_frames):
+    renderer = TrackRenderer(config, NAMES)
+    elapsed = 0.0
+    for frame_idx in range(n_frames):
+        boxes = tracks.step(frame_idx, config.write_every_n_frames)
+        im0 = frame.copy()
+        start = perf_counter()
+        renderer.render(
+            im0,
+            tracks.track_ids,
+            boxes,
+            tracks.clss,
+            tracks.speed,
+            tracks.baseline,
+            tracks.track_history,
+            tracks.track_directions,
+        )
+        elapsed += perf_counter() - start
+    return n_frames / elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tracks", type=int, default=120)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument(
+        "--scale", type=float, default=0.5, help="annotation_scale of the extra run"
+    )
+    args = parser.parse_args()
+
+    config = DetectorConfig(show=False, draw_tracks=True, draw_direction=True)
+    frame = np.zeros((args.height, args.width, 3), dtype=np.uint8)
+
+    def tracks():
+        return SyntheticTracks(args.tracks, args.width, args.height)
+
+    results = [("Annotator", run_annotator(config, tracks(), frame, args.frames))]
+    results.append(
+        ("TrackRenderer", run_renderer(config, tracks(), frame, args.frames))
+    )
+    config.annotation_scale = args.scale
+    results.append(
+        (
+            f"TrackRenderer x{args.scale}",
+            run_renderer(config, tracks(), frame, args.frames),
+        )
+    )
+
+    print(f"{args.tracks} tracks, {args.width}x{args.height}, {args.frames} frames")
+    baseline_fps = results[0][1]
+    for name, fps in results:
+        print(f"{name:<22} {fps:8.1f} frames/s  {fps / baseline_fps:5.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
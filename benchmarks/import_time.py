@@ -0,0 +1,127 @@
+"""
+Import-time benchmark guarding against heavy libraries being loaded eagerly.
+
+Each entry module is imported, and each entry script run, in a fresh
+interpreter. The benchmark fails if one of them pulls in torch, ultralytics,
+scipy or cv2, if it takes longer than the given budget, or if it fails.
+
+Usage:
+    python benchmarks/import_time.py [--budget SECONDS] [--repeat N]
+        [--allow-missing]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["torch", "ultralytics", "scipy", "cv2"]
+
+# Modules that must import without loading any of HEAVY_MODULES
+ENTRY_MODULES = [
+    "config.config_handler",
+    "analysis.trend_analyzer",
+    "core.video_processor",
+    "utils.metrics",
+    "api",
+]
+
+# Script invocations that must not load any of HEAVY_MODULES either; scripts
+# run their main() on import, so they are executed instead of imported
+ENTRY_SCRIPTS = [
+    ["cli.py", "--help"],
+]
+
+PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module({module!r})
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+SCRIPT_PROBE = """
+import json, runpy, sys, time
+sys.argv = {argv!r}
+start = time.perf_counter()
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+except SystemExit as e:
+    if e.code not in (None, 0):
+        raise
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure(probe: str):
+    """Run a probe in a fresh interpreter and return its result or error."""
+    result = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+    return json.loads(result.stdout.strip().splitlines()[-1]), None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--budget", type=float, default=2.0, help="Maximum import time in seconds"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Imports per module, best is kept"
+    )
+    parser.add_argument(
+        "--allow-missing",
+        action="store_true",
+        help="Skip entry modules whose dependencies are not installed",
+    )
+    args = parser.parse_args()
+
+    probes = [
+        (module, PROBE.format(module=module, heavy=HEAVY_MODULES))
+        for module in ENTRY_MODULES
+    ] + [
+        (" ".join(argv), SCRIPT_PROBE.format(argv=argv, heavy=HEAVY_MODULES))
+        for argv in ENTRY_SCRIPTS
+    ]
+
+    failed = False
+    for name, probe in probes:
+        runs = [measure(probe) for _ in range(args.repeat)]
+        errors = [error for _, error in runs if error]
+        if errors:
+            # A missing heavy module means the entry module tried to load it
+            missing = errors[0].startswith("ModuleNotFoundError") and not any(
+                f"'{heavy}" in errors[0] for heavy in HEAVY_MODULES
+            )
+            if args.allow_missing and missing:
+                print(f"{name:<28} SKIP  ({errors[0]})")
+            else:
+                print(f"{name:<28} FAIL  ({errors[0]})")
+                failed = True
+            continue
+
+        best = min(runs, key=lambda run: run[0]["seconds"])[0]
+        status = "OK"
+        if best["heavy"]:
+            status = f"FAIL  loaded {', '.join(best['heavy'])}"
+        elif best["seconds"] > args.budget:
+            status = f"FAIL  over budget of {args.budget:.2f}s"
+        failed = failed or status != "OK"
+        print(f"{name:<28} {best['seconds'] * 1000:8.1f} ms  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
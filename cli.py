@@ -47,6 +47,61 @@ def parse_args():
         "--show", action="store_true", help="Show processing in real-time"
     )
 
+    parser.add_argument(
+        "--clip-export",
+        action="store_true",
+        default=None,
+        help="Write short clips around events instead of the full output video",
+    )
+
+    parser.add_argument(
+        "--clip-dir",
+        type=str,
+        help="Directory for event clips (defaults to <output or input>_clips)",
+    )
+
+    parser.add_argument(
+        "--clip-speed-threshold",
+        type=float,
+        help="Also start a clip when a vehicle exceeds this speed (0 disables)",
+    )
+
+    parser.add_argument(
+        "--aggregation-interval",
+        type=float,
+        help="Aggregate finalized tracks into rollups of N seconds (0 disables)",
+    )
+
+    parser.add_argument(
+        "--aggregation-path",
+        type=str,
+        help="Path of the rollups file (defaults to <output or input>.rollups.jsonl)",
+    )
+
+    parser.add_argument(
+        "--aggregation-start-time",
+        type=float,
+        help="Time of the first frame in seconds (e.g. Unix epoch) for rollups",
+    )
+
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=int,
+        help="Save a checkpoint every N frames (0 disables checkpointing)",
+    )
+
+    parser.add_argument(
+        "--checkpoint-path",
+        type=str,
+        help="Path of the checkpoint file (defaults to <output or input>.ckpt)",
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume processing from the last checkpoint",
+    )
+
     return parser.parse_args()
 
 
@@ -69,7 +124,9 @@ def main():
     output = args.output
     if not os.path.isabs(args.input):
         args.input = os.path.join(config.base_dir, args.input)
-    process_video(video_path=args.input, config=config, output_path=output)
+    process_video(
+        video_path=args.input, config=config, output_path=output, resume=args.resume
+    )
     return 0
 
 
@@ -1,7 +1,7 @@
 import yaml
 from pathlib import Path
-from typing import Dict, Any
-from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, field
 from pathlib import Path
 
 
@@ -27,6 +27,8 @@ class DetectorConfig:
     draw_tracks: bool = False
     draw_direction: bool = False
     line_width: int = 2
+    fast_annotation: bool = True  # cached single-pass renderer instead of Annotator
+    annotation_scale: float = 1.0  # output resolution factor, fast annotation only
 
     # Analysis settings
     do_analyze: bool = True
@@ -38,6 +40,30 @@ class DetectorConfig:
     correlation_threshold: float = 0.5
     speed_history_window_size: int = 15
 
+    # Aggregation settings
+    aggregation_interval: float = 0.0  # rollup bucket in seconds, 0 disables it
+    aggregation_track_timeout: int = 30  # frames unseen before a track is final
+    aggregation_path: Optional[str] = None  # "<output or input>.rollups.jsonl"
+    aggregation_start_time: float = 0.0  # time of the first frame, e.g. epoch seconds
+
+    # Clip export settings
+    clip_export: bool = False  # write event clips instead of the full video
+    clip_dir: Optional[str] = None  # defaults to "<output or input stem>_clips"
+    clip_pre_roll_seconds: float = 2.0
+    clip_pre_roll_max_bytes: int = 128 * 1024 * 1024  # memory cap of the pre-roll
+    clip_pre_roll_scale: float = 0.5  # pre-roll frames are buffered downscaled
+    clip_pre_roll_jpeg_quality: int = 75  # 0 buffers raw frames
+    clip_post_roll_seconds: float = 3.0
+    clip_max_seconds: float = 30.0
+    clip_speed_threshold: float = 0.0  # km/h, 0 disables the speed trigger
+    clip_trigger_states: List[str] = field(
+        default_factory=lambda: ["ARRIVING", "DEPARTING"]
+    )
+
+    # Checkpoint settings
+    checkpoint_interval: int = 0  # frames between checkpoints, 0 disables them
+    checkpoint_path: Optional[str] = None  # defaults to "<output or input>.ckpt"
+
     @classmethod
     def from_dict(cls, config_dict: Dict[str, Any]) -> "DetectorConfig":
         """Create config from dictionary."""
@@ -45,11 +71,16 @@ class DetectorConfig:
             **{k: v for k, v in config_dict.items() if k in cls.__dataclass_fields__}
         )
 
+    def output_size(self, frame_width: int, frame_height: int) -> Tuple[int, int]:
+        """Size of the annotated frames for the given input frame size."""
+        scale = min(self.annotation_scale, 1.0) if self.fast_annotation else 1.0
+        return int(frame_width * scale), int(frame_height * scale)
+
     def update_from_args(self, args) -> None:
         """Update config with command line arguments."""
-        for field in self.__dataclass_fields__:
-            if hasattr(args, field) and getattr(args, field) is not None:
-                setattr(self, field, getattr(args, field))
+        for name in self.__dataclass_fields__:
+            if hasattr(args, name) and getattr(args, name) is not None:
+                setattr(self, name, getattr(args, name))
 
 
 def load_config(config_path: str) -> DetectorConfig:
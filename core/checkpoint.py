@@ -0,0 +1,126 @@
+import os
+import pickle
+import shutil
+import subprocess
+from typing import Any, Dict, List, Optional
+
+CHECKPOINT_VERSION = 3
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    """
+    Atomically write a checkpoint to disk.
+
+    The checkpoint is written to a temporary file next to the target and then
+    renamed, so a crash while saving leaves the previous checkpoint intact.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(
+            {"version": CHECKPOINT_VERSION, **checkpoint},
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    """Load a checkpoint written by save_checkpoint, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        checkpoint = pickle.load(f)
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version in {path}")
+    return checkpoint
+
+
+def segment_path(output_path: str, index: int) -> str:
+    """Path of the index-th output segment written while checkpointing."""
+    stem, ext = os.path.splitext(output_path)
+    return f"{stem}.part{index:04d}{ext}"
+
+
+def reencode_segments(segment_paths: List[str], output_path: str) -> None:
+    """Concatenate video segments by decoding and re-encoding them with OpenCV."""
+    import cv2
+
+    writer = None
+    for path in segment_paths:
+        cap = cv2.VideoCapture(path)
+        if cap.isOpened():
+            if writer is None:
+                size = (
+                    int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                    int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                )
+                writer = cv2.VideoWriter(
+                    output_path,
+                    cv2.VideoWriter_fourcc(*"mp4v"),
+                    cap.get(cv2.CAP_PROP_FPS),
+                    size,
+                )
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                writer.write(frame)
+        cap.release()
+    if writer:
+        writer.release()
+
+
+def join_segments(segment_paths: List[str], output_path: str) -> None:
+    """
+    Concatenate video segments into a single file and delete them.
+
+    A single segment is simply renamed. Several segments are joined by stream
+    copy with the ffmpeg concat demuxer, or re-encoded with OpenCV when no
+    ffmpeg executable is available or the stream copy fails, so the output
+    file always exists afterwards.
+    """
+    segment_paths = [path for path in segment_paths if os.path.exists(path)]
+    if not segment_paths:
+        return
+    if len(segment_paths) == 1:
+        os.replace(segment_paths[0], output_path)
+        return
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        reencode_segments(segment_paths, output_path)
+    else:
+        list_path = f"{output_path}.segments.txt"
+        with open(list_path, "w") as f:
+            for path in segment_paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        try:
+            subprocess.run(
+                [
+                    ffmpeg,
+                    "-y",
+                    "-loglevel",
+                    "error",
+                    "-f",
+                    "concat",
+                    "-safe",
+                    "0",
+                    "-i",
+                    list_path,
+                    "-c",
+                    "copy",
+                    output_path,
+                ],
+                check=True,
+            )
+        except subprocess.CalledProcessError:
+            # e.g. segments with different sizes, which only a re-encode joins
+            reencode_segments(segment_paths, output_path)
+        finally:
+            os.remove(list_path)
+
+    for path in segment_paths:
+        os.remove(path)
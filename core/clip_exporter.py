@@ -0,0 +1,259 @@
+import json
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from config.config_handler import DetectorConfig
+from core.checkpoint import join_segments, segment_path
+from models.enums import VehicleState
+
+
+class ClipExporter:
+    """
+    Writes short annotated clips around traffic events instead of a full video.
+
+    The last `clip_pre_roll_seconds` of annotated frames are kept in a rolling
+    buffer. When a track changes to one of `clip_trigger_states` or its speed
+    rises above `clip_speed_threshold`, a clip is opened with the buffered
+    frames and kept open until `clip_post_roll_seconds` after the last event
+    (at most `clip_max_seconds`). Each closed clip is recorded in
+    `index.json` with its path, frame range, timestamps and events.
+
+    Pre-roll frames are scaled by `clip_pre_roll_scale` and JPEG-encoded at
+    `clip_pre_roll_jpeg_quality` (0 keeps raw frames), and the buffer is
+    capped at `clip_pre_roll_max_bytes`, so memory stays bounded for
+    high-resolution inputs. Per-track trigger state is dropped for tracks not
+    seen for `TRACK_TIMEOUT_SECONDS`.
+
+    For checkpointing, an open clip is written in parts that are closed by
+    `close_part` and joined into the indexed clip path when the clip ends;
+    `get_state` and `set_state` carry the trigger state, pre-roll buffer and
+    open clip across a resume.
+    """
+
+    TRACK_TIMEOUT_SECONDS = 5.0
+
+    def __init__(self, config: DetectorConfig, clip_dir: str, fps: float):
+        self.config = config
+        self.clip_dir = clip_dir
+        self.fps = fps or 30.0  # some containers report 0 fps
+        self.pre_roll_frames = int(config.clip_pre_roll_seconds * self.fps)
+        self.post_roll_frames = int(config.clip_post_roll_seconds * self.fps)
+        self.max_frames = int(config.clip_max_seconds * self.fps)
+        self.track_timeout_frames = int(self.TRACK_TIMEOUT_SECONDS * self.fps)
+        self.trigger_states = {
+            VehicleState[name] for name in config.clip_trigger_states
+        }
+        self.index_path = os.path.join(clip_dir, "index.json")
+
+        # (frame index, JPEG bytes or raw frame) of the frames preceding the next clip
+        self.buffer: Deque[Tuple[int, Union[bytes, np.ndarray]]] = deque()
+        self.buffer_bytes = 0
+        self.track_states: Dict[int, VehicleState] = {}
+        self.speeding: set = set()
+        self.last_seen: Dict[int, int] = {}
+        self.writer = None
+        self.clip: Optional[Dict[str, Any]] = None
+        self.clip_parts = 0  # parts of the open clip closed so far
+        self.clip_end = 0
+        self.clips: List[Dict[str, Any]] = []
+
+        os.makedirs(clip_dir, exist_ok=True)
+
+    def get_state(self) -> Dict[str, Any]:
+        """Picklable snapshot of the exporter state, taken after `close_part`."""
+        return {
+            "buffer": list(self.buffer),
+            "track_states": self.track_states,
+            "speeding": self.speeding,
+            "last_seen": self.last_seen,
+            "clip": self.clip,
+            "clip_parts": self.clip_parts,
+            "clip_end": self.clip_end,
+            "clips": self.clips,
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """
+        Restores a state produced by `get_state`.
+
+        An open clip continues with its next part, overwriting any part written
+        after the checkpoint, and the index is rewritten without the clips
+        completed after it.
+        """
+        self.buffer = deque(state["buffer"])
+        self.buffer_bytes = sum(self._buffered_size(data) for _, data in self.buffer)
+        self.track_states = state["track_states"]
+        self.speeding = state["speeding"]
+        self.last_seen = state["last_seen"]
+        self.clip = state["clip"]
+        self.clip_parts = state["clip_parts"]
+        self.clip_end = state["clip_end"]
+        self.clips = state["clips"]
+        self.write_index()
+
+    def detect_events(self, frame_idx: int, detector) -> List[Dict[str, Any]]:
+        """Collect state transitions and threshold crossings of the current tracks."""
+        events = []
+        timestamp = frame_idx / self.fps
+        for track_id in detector.track_ids:
+            self.last_seen[track_id] = frame_idx
+            state = detector.baseline.get(track_id)
+            if (
+                isinstance(state, VehicleState)
+                and self.track_states.get(track_id) != state
+            ):
+                self.track_states[track_id] = state
+                if state in self.trigger_states:
+                    events.append(
+                        {
+                            "track_id": int(track_id),
+                            "type": state.name,
+                            "frame": frame_idx,
+                            "time": timestamp,
+                        }
+                    )
+
+            if self.config.clip_speed_threshold > 0:
+                speed = detector.speed.get(track_id, 0)
+                if speed > self.config.clip_speed_threshold:
+                    if track_id not in self.speeding:
+                        self.speeding.add(track_id)
+                        events.append(
+                            {
+                                "track_id": int(track_id),
+                                "type": "SPEEDING",
+                                "frame": frame_idx,
+                                "time": timestamp,
+                                "speed": float(speed),
+                            }
+                        )
+                else:
+                    self.speeding.discard(track_id)
+        return events
+
+    def prune_tracks(self, frame_idx: int) -> None:
+        """Forget the trigger state of tracks that are no longer tracked."""
+        cutoff = frame_idx - self.track_timeout_frames
+        for track_id in [t for t, seen in self.last_seen.items() if seen < cutoff]:
+            del self.last_seen[track_id]
+            self.track_states.pop(track_id, None)
+            self.speeding.discard(track_id)
+
+    def _buffer_frame(self, frame_idx: int, frame: np.ndarray) -> None:
+        import cv2
+
+        scale = self.config.clip_pre_roll_scale
+        if scale < 1.0:
+            frame = cv2.resize(
+                frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+            )
+        quality = self.config.clip_pre_roll_jpeg_quality
+        if quality > 0:
+            ok, encoded = cv2.imencode(
+                ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality]
+            )
+            if not ok:
+                return
+            data = encoded.tobytes()
+        else:
+            data = frame
+        self.buffer.append((frame_idx, data))
+        self.buffer_bytes += self._buffered_size(data)
+        while self.buffer and (
+            len(self.buffer) > self.pre_roll_frames
+            or self.buffer_bytes > self.config.clip_pre_roll_max_bytes
+        ):
+            self.buffer_bytes -= self._buffered_size(self.buffer.popleft()[1])
+
+    @staticmethod
+    def _buffered_size(data: Union[bytes, np.ndarray]) -> int:
+        return data.nbytes if isinstance(data, np.ndarray) else len(data)
+
+    def _write(self, frame: np.ndarray) -> None:
+        if self.writer is None:
+            import cv2
+
+            h, w = frame.shape[:2]
+            self.writer = cv2.VideoWriter(
+                segment_path(self.clip["clip"], self.clip_parts),
+                cv2.VideoWriter_fourcc(*"mp4v"),
+                self.fps,
+                (w, h),
+            )
+        self.writer.write(frame)
+
+    def _open_clip(self, frame_idx: int, frame: np.ndarray) -> None:
+        import cv2
+
+        path = os.path.join(self.clip_dir, f"clip_{len(self.clips):04d}.mp4")
+        start_frame = self.buffer[0][0] if self.buffer else frame_idx
+        self.clip = {
+            "clip": path,
+            "start_frame": start_frame,
+            "start_time": start_frame / self.fps,
+            "events": [],
+        }
+        self.clip_parts = 0
+        h, w = frame.shape[:2]
+        for _, data in self.buffer:
+            if not isinstance(data, np.ndarray):
+                data = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            if data.shape[:2] != (h, w):
+                data = cv2.resize(data, (w, h), interpolation=cv2.INTER_LINEAR)
+            self._write(data)
+        self.buffer.clear()
+        self.buffer_bytes = 0
+
+    def close_part(self) -> None:
+        """Close the current part of the open clip so it is complete on disk."""
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+            self.clip_parts += 1
+
+    def _close_clip(self, last_frame: int) -> None:
+        self.close_part()
+        path = self.clip["clip"]
+        join_segments([segment_path(path, i) for i in range(self.clip_parts)], path)
+        self.clip_parts = 0
+        self.clip["end_frame"] = last_frame
+        self.clip["end_time"] = (last_frame + 1) / self.fps
+        self.clips.append(self.clip)
+        self.clip = None
+        self.write_index()
+
+    def update(self, frame_idx: int, frame: np.ndarray, detector) -> None:
+        """Feed an annotated frame and the detector state after processing it."""
+        events = self.detect_events(frame_idx, detector)
+        self.prune_tracks(frame_idx)
+        if events:
+            if self.clip is None:
+                self._open_clip(frame_idx, frame)
+            self.clip["events"].extend(events)
+            self.clip_end = frame_idx + self.post_roll_frames
+
+        if self.clip is None:
+            if self.pre_roll_frames:
+                self._buffer_frame(frame_idx, frame)
+            return
+
+        self._write(frame)
+        if (
+            frame_idx >= self.clip_end
+            or frame_idx - self.clip["start_frame"] + 1 >= self.max_frames
+        ):
+            self._close_clip(frame_idx)
+
+    def finish(self, last_frame: int) -> None:
+        """Close the open clip, if any, and write the final index."""
+        if self.clip is not None:
+            self._close_clip(last_frame)
+        else:
+            self.write_index()
+
+    def write_index(self) -> None:
+        with open(self.index_path, "w") as f:
+            json.dump(self.clips, f, indent=2)
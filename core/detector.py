@@ -1,4 +1,4 @@
-from typing import Dict, Set, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 import cv2
 import numpy as np
 from collections import defaultdict
@@ -8,9 +8,12 @@ from ultralytics.solutions.solutions import BaseSolution
 from ultralytics.utils.plotting import Annotator
 from config.config_handler import DetectorConfig
 from utils.calculations import calculate_distance, calculate_direction
-from utils.visualisations import draw_box_label
+from utils.visualisations import TrackRenderer, draw_box_label
 from analysis.trend_analyzer import TrendAnalyzer
-from time import time
+from analysis.aggregator import TrafficAggregator
+from models.enums import VehicleState
+from utils.metrics import FRAMES_TOTAL, FRAME_RATE, STAGE_SECONDS, active_detectors
+from time import perf_counter, time
 
 
 class DirectionDetector(BaseSolution):
@@ -42,9 +45,13 @@ class DirectionDetector(BaseSolution):
         self.display_everything: bool = True
         self.trend_analyzer: TrendAnalyzer = TrendAnalyzer()
         self.config: DetectorConfig = config
+        self.frame_idx: int = 0  # frames processed so far
+        self.aggregator: Optional[TrafficAggregator] = None
+        self.renderer: TrackRenderer = TrackRenderer(config, self.names)
 
         self.CFG["tracker"] = "BYTETracker"
         self.CFG["verbose"] = False
+        active_detectors.add(self)
 
     def display_output(self, im0):
         if self.config.show and self.env_check:
@@ -68,6 +75,10 @@ class DirectionDetector(BaseSolution):
             x (int): The x-coordinate of the mouse event position in the window.
             y (int): The y-coordinate of the mouse event position in the window.
         """
+        if self.config.fast_annotation and self.config.annotation_scale < 1:
+            # The window shows the downscaled output, boxes are in input pixels
+            x /= self.config.annotation_scale
+            y /= self.config.annotation_scale
         if event == cv2.EVENT_LBUTTONDBLCLK:
             self.display_everything = not self.display_everything
             self.selected_boxes = set()
@@ -100,6 +111,164 @@ class DirectionDetector(BaseSolution):
         if len(self.track_speed_history) > self.config.speed_history_window_size:
             self.track_speed_history.pop(0)
 
+    def attach_aggregator(self, aggregator: TrafficAggregator) -> None:
+        """
+        Attaches a streaming aggregation stage that receives every track and its
+        speed, state and direction updates.
+
+        Args:
+            aggregator (TrafficAggregator): Aggregator to feed while processing.
+        """
+        self.aggregator = aggregator
+
+    def track_state_containers(self) -> List:
+        """Returns the per-track state containers, for memory accounting."""
+        return [
+            self.speed,
+            self.track_prev_time,
+            self.track_prev_point,
+            self.track_frame_count,
+            self.track_directions,
+            self.baseline,
+            self.speed_history,
+            self.track_history,
+        ]
+
+    def record_stage_times(
+        self, extract_time: float, analysis_time: float, annotation_time: float
+    ) -> None:
+        """
+        Records per-frame stage latencies to the metrics registry.
+
+        Inference time is taken from the ultralytics per-result profile
+        (pre-processing, inference and post-processing); the remainder of the
+        track extraction is attributed to the tracker.
+        """
+        inference_time = extract_time
+        if self.tracks:
+            inference_time = min(
+                sum(v for v in self.tracks[0].speed.values() if v) / 1000,
+                extract_time,
+            )
+        STAGE_SECONDS.observe(inference_time, "inference")
+        STAGE_SECONDS.observe(extract_time - inference_time, "tracking")
+        STAGE_SECONDS.observe(analysis_time, "analysis")
+        STAGE_SECONDS.observe(annotation_time, "annotation")
+        FRAMES_TOTAL.inc()
+        FRAME_RATE.mark()
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Collects the detector and tracker state needed to resume processing.
+
+        Previous-write times are stored as ages relative to now, so that speeds
+        computed right after a resume use the same time base.
+
+        Returns:
+            Dict[str, Any]: Picklable snapshot of the per-track and tracker state.
+        """
+        from ultralytics.trackers.basetrack import BaseTrack
+
+        now = time()
+        predictor = getattr(self.model, "predictor", None)
+        return {
+            "speed": self.speed,
+            "track_prev_age": {
+                track_id: now - prev_time if prev_time else None
+                for track_id, prev_time in self.track_prev_time.items()
+            },
+            "track_prev_point": self.track_prev_point,
+            "track_frame_count": self.track_frame_count,
+            "track_directions": self.track_directions,
+            "baseline": self.baseline,
+            "speed_history": self.speed_history,
+            "track_history": self.track_history,
+            "trackers": getattr(predictor, "trackers", None),
+            "track_id_count": BaseTrack._count,
+            "frame_idx": self.frame_idx,
+            "aggregator": self.aggregator,
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """
+        Restores a state produced by `get_state`.
+
+        The model predictor, and with it the tracker, is only created on the
+        first tracked frame, so the saved trackers and track id counter are
+        swapped in by a one-shot callback that runs before the tracker update
+        of that frame.
+
+        Args:
+            state (Dict[str, Any]): Snapshot returned by `get_state`.
+        """
+        from ultralytics.trackers.basetrack import BaseTrack
+
+        now = time()
+        self.speed = state["speed"]
+        self.track_prev_time = {
+            track_id: now - age if age is not None else 0
+            for track_id, age in state["track_prev_age"].items()
+        }
+        self.track_prev_point = state["track_prev_point"]
+        self.track_frame_count = state["track_frame_count"]
+        self.track_directions = state["track_directions"]
+        self.baseline = state["baseline"]
+        self.speed_history = state["speed_history"]
+        self.track_history = state["track_history"]
+        self.frame_idx = state["frame_idx"]
+        if self.aggregator and state["aggregator"]:
+            state["aggregator"].on_rollup = self.aggregator.on_rollup
+            self.aggregator = state["aggregator"]
+
+        trackers = state["trackers"]
+        if trackers is None:
+            return
+        track_id_count = state["track_id_count"]
+        restored = False
+
+        def restore_trackers(predictor):
+            nonlocal restored
+            if not restored:
+                # The new tracker resets the id counter when it is created, so
+                # it is restored together with the trackers to keep ids unique
+                predictor.trackers = trackers
+                BaseTrack._count = track_id_count
+                restored = True
+
+        self.model.add_callback("on_predict_postprocess_end", restore_trackers)
+
+    def get_track_results(self) -> List[Dict[str, Any]]:
+        """
+        Collects the current per-track results in a JSON-serializable form.
+
+        Speed, state and direction are None until the track has been observed
+        for `write_every_n_frames` frames. Direction is the angle in radians of
+        the last computed track heading.
+
+        Returns:
+            List[Dict[str, Any]]: One entry per track of the last processed frame.
+        """
+        results = []
+        for box, track_id, cls in zip(self.boxes, self.track_ids, self.clss):
+            state = self.baseline.get(track_id)
+            results.append(
+                {
+                    "track_id": int(track_id),
+                    "class": self.names[int(cls)],
+                    "box": [float(v) for v in box],
+                    "speed": (
+                        float(self.speed[track_id]) if track_id in self.speed else None
+                    ),
+                    "state": state.name if isinstance(state, VehicleState) else None,
+                    "direction": (
+                        float(self.track_directions[track_id])
+                        if track_id in self.speed
+                        else None
+                    ),
+                }
+            )
+        return results
+
     def estimate_speed(self, im0):
         """
         Provides functionality to estimate the object speed based on tracked object data across frames.
@@ -115,12 +284,24 @@ class DirectionDetector(BaseSolution):
         Tuple[numpy.ndarray, bool]
             The processed frame with annotations and a flag indicating whether to stop further processing.
         """
-        self.annotator = Annotator(
-            im0, line_width=self.config.line_width
-        )  # Initialize annotator
+        if not self.config.fast_annotation:
+            self.annotator = Annotator(
+                im0, line_width=self.config.line_width
+            )  # Initialize annotator
+        start = perf_counter()
         self.extract_tracks(im0)  # Extract tracks
+        extract_time = perf_counter() - start
+        annotation_time = 0.0
+        drawn = []  # indices of the tracks to draw with the renderer
+
+        for i, (box, track_id, cls) in enumerate(
+            zip(self.boxes, self.track_ids, self.clss)
+        ):
+            if self.aggregator:
+                self.aggregator.update_track(
+                    track_id, self.names[int(cls)], self.frame_idx
+                )
 
-        for box, track_id, cls in zip(self.boxes, self.track_ids, self.clss):
             if not self.display_everything:
                 if track_id not in self.selected_boxes:
                     continue
@@ -132,18 +313,23 @@ class DirectionDetector(BaseSolution):
                 self.track_directions[track_id] = 0
                 self.track_prev_time[track_id] = 0
 
-            draw_box_label(
-                track_id,
-                box,
-                cls,
-                self.speed,
-                self.names,
-                self.baseline,
-                self.annotator,
-                self.track_line,
-                self.track_directions,
-                self.config,
-            )
+            if self.config.fast_annotation:
+                drawn.append(i)
+            else:
+                draw_start = perf_counter()
+                draw_box_label(
+                    track_id,
+                    box,
+                    cls,
+                    self.speed,
+                    self.names,
+                    self.baseline,
+                    self.annotator,
+                    self.track_line,
+                    self.track_directions,
+                    self.config,
+                )
+                annotation_time += perf_counter() - draw_start
 
             distance_delta = calculate_distance(
                 self.track_line[-1], self.track_prev_point[track_id]
@@ -176,6 +362,34 @@ class DirectionDetector(BaseSolution):
                 self.track_prev_time[track_id] = time()
                 self.track_prev_point[track_id] = self.track_line[-1]
 
+                if self.aggregator:
+                    self.aggregator.record_measurement(
+                        track_id,
+                        self.speed[track_id],
+                        self.baseline[track_id],
+                        self.track_directions[track_id],
+                    )
+
+        if self.aggregator:
+            self.aggregator.step(self.frame_idx)
+        self.frame_idx += 1
+        analysis_time = perf_counter() - start - extract_time - annotation_time
+
+        if self.config.fast_annotation:
+            draw_start = perf_counter()
+            im0 = self.renderer.render(
+                im0,
+                [self.track_ids[i] for i in drawn],
+                self.boxes[drawn] if drawn else [],
+                [self.clss[i] for i in drawn],
+                self.speed,
+                self.baseline,
+                self.track_history,
+                self.track_directions,
+            )
+            annotation_time += perf_counter() - draw_start
+        self.record_stage_times(extract_time, analysis_time, annotation_time)
+
         stop = self.display_output(im0)
 
         return im0, stop  # return output image for more usage
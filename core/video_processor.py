@@ -1,22 +1,58 @@
-import cv2
-from typing import Optional
-from core.detector import DirectionDetector
+import json
+import os
+import numpy as np
+from typing import TYPE_CHECKING, Callable, Optional
 from config.config_handler import DetectorConfig
+from core.checkpoint import (
+    join_segments,
+    load_checkpoint,
+    save_checkpoint,
+    segment_path,
+)
+from analysis.aggregator import TrafficAggregator
+from core.clip_exporter import ClipExporter
+from utils.metrics import STAGE_SECONDS
+from time import perf_counter
+
+if TYPE_CHECKING:
+    from core.detector import DirectionDetector
 
 
 def process_video(
     video_path: str,
     config: DetectorConfig,
     output_path: Optional[str] = None,
+    on_frame: Optional[Callable[[int, np.ndarray, "DirectionDetector"], bool]] = None,
+    resume: bool = False,
 ) -> None:
     """
     Process a video file using the provided detector.
 
+    With `config.checkpoint_interval` set, the tracker and detector state are
+    checkpointed every that many frames and the output is written in segments
+    that are closed at each checkpoint and joined without re-encoding once
+    processing completes. Resuming requires checkpointing to be enabled.
+
+    With `config.aggregation_interval` set, traffic rollups for each interval
+    are appended as JSON lines to `config.aggregation_path`.
+
+    With `config.clip_export` set, no full output video is written. Short
+    annotated clips around events are written to `config.clip_dir` instead,
+    together with an `index.json` mapping events to clips and timestamps.
+
     Args:
         video_path: Path to the input video file
         config: DetectorConfig instance to process frames
         output_path: Optional path to save the processed video
+        on_frame: Optional callback invoked after each processed frame with the
+            frame index, the processed frame and the detector. Returning True
+            stops processing.
+        resume: Continue from the last checkpoint, if there is one
     """
+    # Deferred so that importing this module does not load OpenCV or the ML stack
+    import cv2
+    from core.detector import DirectionDetector
+
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         raise ValueError(f"Could not open video file: {video_path}")
@@ -24,20 +60,87 @@ def process_video(
     # Get video properties
     frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fps = int(cap.get(cv2.CAP_PROP_FPS))
-
-    # Initialize video writer if output path is provided
-    writer = None
-    if output_path:
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        writer = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
+    fps = cap.get(cv2.CAP_PROP_FPS)  # fractional for NTSC rates such as 29.97
 
     # Initialize detector
     detector = DirectionDetector(config=config, model=config.weights_path)
 
+    checkpointing = config.checkpoint_interval > 0
+    if resume and not checkpointing:
+        raise ValueError("Resuming requires checkpoint_interval > 0")
+    checkpoint_path = config.checkpoint_path or f"{output_path or video_path}.ckpt"
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    if checkpoint and checkpoint["video_path"] != os.path.abspath(video_path):
+        raise ValueError(
+            f"Checkpoint {checkpoint_path} belongs to {checkpoint['video_path']}"
+        )
+    frame_idx = 0
+    segments = 0  # Output segments completed so far
+
+    rollup_file = None
+    if config.aggregation_interval > 0:
+        rollup_path = (
+            config.aggregation_path or f"{output_path or video_path}.rollups.jsonl"
+        )
+        if checkpoint and os.path.exists(rollup_path):
+            # Drop rollups written after the checkpoint, they are emitted again
+            rollup_file = open(rollup_path, "r+")
+            rollup_file.truncate(checkpoint["rollup_offset"])
+            rollup_file.seek(checkpoint["rollup_offset"])
+        else:
+            rollup_file = open(rollup_path, "w")
+
+        def write_rollup(rollup):
+            rollup_file.write(json.dumps(rollup.to_dict()) + "\n")
+            rollup_file.flush()
+
+        detector.attach_aggregator(
+            TrafficAggregator(
+                config.aggregation_interval,
+                fps,
+                config.aggregation_track_timeout,
+                start_time=config.aggregation_start_time,
+                on_rollup=write_rollup,
+            )
+        )
+
+    if checkpoint:
+        detector.set_state(checkpoint["detector"])
+        frame_idx = checkpoint["frame_idx"]
+        segments = checkpoint["segments"]
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+        print(f"Resuming from frame {frame_idx}.")
+
+    # Initialize video writer if output path is provided
+    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+
+    def open_writer():
+        path = segment_path(output_path, segments) if checkpointing else output_path
+        return cv2.VideoWriter(
+            path, fourcc, fps, config.output_size(frame_width, frame_height)
+        )
+
+    # With checkpointing, segments are opened on their first frame so that no
+    # empty segment is left behind at a checkpoint or at the end of the video
+    write_output = bool(output_path) and not config.clip_export
+    writer = open_writer() if write_output and not checkpointing else None
+
+    clip_exporter = None
+    if config.clip_export:
+        clip_dir = (
+            config.clip_dir
+            or f"{os.path.splitext(output_path or video_path)[0]}_clips"
+        )
+        clip_exporter = ClipExporter(config, clip_dir, fps)
+        if checkpoint and checkpoint["clip_exporter"]:
+            clip_exporter.set_state(checkpoint["clip_exporter"])
+
+    completed = False
     try:
         while cap.isOpened():
+            start = perf_counter()
             ret, frame = cap.read()
+            STAGE_SECONDS.observe(perf_counter() - start, "decode")
             if not ret:
                 print(
                     "Video frame is empty or video processing has been successfully completed."
@@ -48,14 +151,68 @@ def process_video(
             processed_frame, stop = detector.estimate_speed(frame)
 
             # Write frame if output requested
+            if write_output and writer is None:
+                writer = open_writer()
             if writer:
+                start = perf_counter()
                 writer.write(processed_frame)
+                STAGE_SECONDS.observe(perf_counter() - start, "encoding")
+            if clip_exporter:
+                start = perf_counter()
+                clip_exporter.update(frame_idx, processed_frame, detector)
+                STAGE_SECONDS.observe(perf_counter() - start, "encoding")
+            if on_frame and on_frame(frame_idx, processed_frame, detector):
+                stop = True
+            frame_idx += 1
+
+            if checkpointing and frame_idx % config.checkpoint_interval == 0:
+                # Close the segment first so the checkpoint only refers to
+                # output that is complete on disk
+                if writer:
+                    writer.release()
+                    writer = None
+                    segments += 1
+                if clip_exporter:
+                    clip_exporter.close_part()
+                save_checkpoint(
+                    checkpoint_path,
+                    {
+                        "video_path": os.path.abspath(video_path),
+                        "frame_idx": frame_idx,
+                        "segments": segments,
+                        "rollup_offset": rollup_file.tell() if rollup_file else 0,
+                        "detector": detector.get_state(),
+                        "clip_exporter": (
+                            clip_exporter.get_state() if clip_exporter else None
+                        ),
+                    },
+                )
+
             if stop:
                 break
+        completed = True
+        if detector.aggregator:
+            detector.aggregator.flush()
+        if clip_exporter:
+            clip_exporter.finish(frame_idx - 1)
 
     finally:
         cap.release()
         if writer:
             writer.release()
+            if checkpointing:
+                segments += 1
+        if clip_exporter:
+            clip_exporter.close_part()
+        if rollup_file:
+            rollup_file.close()
         if config.show:
             cv2.destroyAllWindows()
+
+    if completed and checkpointing:
+        if write_output:
+            join_segments(
+                [segment_path(output_path, i) for i in range(segments)], output_path
+            )
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
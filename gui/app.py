@@ -1,5 +1,5 @@
 from gui.managers import SignalManager
-from gui.threads import VideoThread
+from gui.threads import VideoThread, make_preview
 
 import os
 from PyQt5 import QtGui
@@ -11,9 +11,9 @@ from PyQt5.QtWidgets import (
     QFileDialog,
     QStyle,
 )
-from PyQt5.QtGui import QPixmap, QIcon, QFont
+from PyQt5.QtGui import QPixmap, QIcon, QFont, QGuiApplication
 import cv2
-from PyQt5.QtCore import pyqtSlot, Qt, QSize
+from PyQt5.QtCore import pyqtSlot, QSize
 import numpy as np
 from config.config_handler import DetectorConfig
 
@@ -32,6 +32,7 @@ class App(QWidget):
         self.image_label.resize(self.disply_width, self.display_height)
         # create a text label
         self.textLabel = QLabel("Video")
+        self.fps_label = QLabel("Processing: - frames/s")
         self.config = DetectorConfig()
         self.config.show = False
         self.signal_manager = SignalManager()
@@ -67,6 +68,7 @@ class App(QWidget):
         # create a vertical box layout and add the two labels
         vbox = QVBoxLayout()
         vbox.addWidget(self.image_label)
+        vbox.addWidget(self.fps_label)
         vbox.addWidget(openButton)
         vbox.addWidget(self.playButton)
         vbox.addWidget(saveButton)  # Add Save button to the layout
@@ -93,23 +95,30 @@ class App(QWidget):
         event.accept()
 
     @pyqtSlot(np.ndarray)
-    def update_image(self, cv_img):
-        """Updates the image_label with a new opencv image"""
-        qt_img = self.convert_cv_qt(cv_img)
+    def update_image(self, rgb_image):
+        """Updates the image_label with a downscaled RGB preview frame"""
+        qt_img = self.convert_rgb_qt(rgb_image)
         self.image_label.setPixmap(qt_img)
 
+    @pyqtSlot(float)
+    def update_fps(self, fps):
+        """Updates the processing frames/s label"""
+        self.fps_label.setText(f"Processing: {fps:.1f} frames/s")
+
     def convert_cv_qt(self, cv_img):
         """Convert from an opencv image to QPixmap"""
-        rgb_image = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
+        return self.convert_rgb_qt(
+            make_preview(cv_img, self.disply_width, self.display_height)
+        )
+
+    def convert_rgb_qt(self, rgb_image):
+        """Convert from an RGB image that already fits the display to QPixmap"""
         h, w, ch = rgb_image.shape
         bytes_per_line = ch * w
         convert_to_Qt_format = QtGui.QImage(
             rgb_image.data, w, h, bytes_per_line, QtGui.QImage.Format_RGB888
         )
-        p = convert_to_Qt_format.scaled(
-            self.disply_width, self.display_height, Qt.KeepAspectRatio
-        )
-        return QPixmap.fromImage(p)
+        return QPixmap.fromImage(convert_to_Qt_format)
 
     def abrir(self):
         fileName, _ = QFileDialog.getOpenFileName(
@@ -125,9 +134,15 @@ class App(QWidget):
                 True
             )  # Enable Save button after video is opened and processing starts
             # create the video capture thread
-            self.thread = VideoThread(fileName, self.config)
+            self.thread = VideoThread(
+                fileName,
+                self.config,
+                preview_size=(self.disply_width, self.display_height),
+                preview_fps=QGuiApplication.primaryScreen().refreshRate(),
+            )
             # connect its signal to the update_image slot
             self.thread.change_pixmap_signal.connect(self.update_image)
+            self.thread.fps_signal.connect(self.update_fps)
             self.signal_manager.toggle_process_signal.connect(
                 self.thread.set_process_enabled
             )  # start the thread
@@ -1,20 +1,40 @@
 from PyQt5.QtCore import pyqtSignal, QThread
-from core.detector import DirectionDetector
+from time import perf_counter
 import tempfile
+import threading
 import cv2
 import numpy as np
 
 
+def make_preview(cv_img, width, height):
+    """Downscale a BGR frame to fit into width x height, then convert it to RGB"""
+    h, w = cv_img.shape[:2]
+    scale = min(width / w, height / h)
+    if scale < 1:
+        cv_img = cv2.resize(
+            cv_img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA
+        )
+    return cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
+
+
 class VideoThread(QThread):
-    def __init__(self, video_path, config):
+    def __init__(self, video_path, config, preview_size=(640, 480), preview_fps=60.0):
         QThread.__init__(self)
+        # Deferred so the window shows up before the ML stack is loaded
+        from core.detector import DirectionDetector
+
         self.video_path = video_path
         self.config = config
         self.detector = DirectionDetector(
             config=self.config, model=self.config.weights_path
         )
         self._run_flag = True
-        self.process_enabled = True
+        self._process_enabled = threading.Event()
+        self._process_enabled.set()
+
+        # Preview frames are emitted at most at the display refresh rate
+        self.preview_size = preview_size
+        self.preview_interval = 1.0 / preview_fps if preview_fps > 0 else 0.0
 
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".avi")
         self.temp_video_path = temp_file.name  # Get the temporary file path
@@ -25,14 +45,15 @@ class VideoThread(QThread):
         self.frame_height = None
         self.writer = None  # VideoWriter instance
 
-    change_pixmap_signal = pyqtSignal(np.ndarray)
+    change_pixmap_signal = pyqtSignal(np.ndarray)  # downscaled RGB preview
+    fps_signal = pyqtSignal(float)  # processing frames per second
 
     def run(self):
         cap = cv2.VideoCapture(self.video_path)
 
         # Get video properties (for writing)
         if cap.isOpened():
-            self.fps = int(cap.get(cv2.CAP_PROP_FPS))
+            self.fps = cap.get(cv2.CAP_PROP_FPS)
             self.frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
             self.frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
@@ -42,20 +63,22 @@ class VideoThread(QThread):
                 self.temp_video_path,
                 fourcc,
                 self.fps,
-                (self.frame_width, self.frame_height),
+                self.config.output_size(self.frame_width, self.frame_height),
             )
         else:
             print("Error: Unable to open video file.")
             return
 
+        last_preview = 0.0
+        fps_start = perf_counter()
+        fps_frames = 0
         while self._run_flag:
-            if not self.process_enabled:
+            if not self._process_enabled.is_set():
                 print("Processing disabled, waiting...")
-                while (
-                    not self.process_enabled
-                ):  # Wait until processing is enabled again
-                    QThread.msleep(100)  # Sleep for 100ms to avoid busy waiting
-                continue  # Skip to the next iteration once processing is enabled
+                self._process_enabled.wait()  # Woken by set_process_enabled or stop
+                fps_start = perf_counter()
+                fps_frames = 0
+                continue
 
             ret, cv_img = cap.read()
             if not ret:
@@ -65,7 +88,19 @@ class VideoThread(QThread):
                 break
 
             processed_frame, stop = self.detector.estimate_speed(cv_img)
-            self.change_pixmap_signal.emit(processed_frame)
+
+            now = perf_counter()
+            if now - last_preview >= self.preview_interval:
+                last_preview = now
+                self.change_pixmap_signal.emit(
+                    make_preview(processed_frame, *self.preview_size)
+                )
+
+            fps_frames += 1
+            if now - fps_start >= 1.0:
+                self.fps_signal.emit(fps_frames / (now - fps_start))
+                fps_start = now
+                fps_frames = 0
 
             # Write processed frame to the video file
             if self.writer:
@@ -76,9 +111,13 @@ class VideoThread(QThread):
             self.writer.release()  # Release the VideoWriter when done
 
     def set_process_enabled(self, enabled):
-        self.process_enabled = enabled
+        if enabled:
+            self._process_enabled.set()
+        else:
+            self._process_enabled.clear()
 
     def stop(self):
         """Sets run flag to False and waits for thread to finish"""
         self._run_flag = False
+        self._process_enabled.set()  # Wake the thread if it is paused
         self.wait()
@@ -0,0 +1,248 @@
+import os
+import sys
+import threading
+import weakref
+from bisect import bisect_left
+from collections import defaultdict
+from time import monotonic
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    return f"{{{inner}}}"
+
+
+class Counter:
+    """Monotonically increasing value, optionally split by a single label."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, label_value: str = "") -> None:
+        with self._lock:
+            self._values[label_value] += amount
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = list(self._values.items())
+        for label_value, value in items:
+            labels = {self.label: label_value} if self.label else {}
+            yield self.name, labels, value
+
+
+class Gauge:
+    """Value that can go up and down, or is computed by a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, help: str, func: Optional[Callable[[], float]] = None
+    ):
+        self.name = name
+        self.help = help
+        self.func = func
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        yield self.name, {}, self.func() if self.func else self._value
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by a single label."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label: Optional[str] = None,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        # label value -> [per-bucket counts (last is +Inf), sum]
+        self._values: Dict[str, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label_value: str = "") -> None:
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_value)
+            if entry is None:
+                entry = [[0] * (len(self.buckets) + 1), 0.0]
+                self._values[label_value] = entry
+            entry[0][idx] += 1
+            entry[1] += value
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = [(k, list(v[0]), v[1]) for k, v in self._values.items()]
+        for label_value, counts, total in items:
+            labels = {self.label: label_value} if self.label else {}
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", {**labels, "le": le}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class RateMeter:
+    """Events per second over the last completed one-second window."""
+
+    def __init__(self):
+        self._window_start = int(monotonic())
+        self._current = 0
+        self._previous = 0
+        self._lock = threading.Lock()
+
+    def _roll(self, now: int) -> None:
+        if now != self._window_start:
+            self._previous = self._current if now == self._window_start + 1 else 0
+            self._current = 0
+            self._window_start = now
+
+    def mark(self, n: int = 1) -> None:
+        with self._lock:
+            self._roll(int(monotonic()))
+            self._current += n
+
+    def rate(self) -> float:
+        with self._lock:
+            self._roll(int(monotonic()))
+            return float(self._previous)
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def directory_size(path: str) -> int:
+    """Total size in bytes of the regular files directly inside a directory."""
+    if not os.path.isdir(path):
+        return 0
+    with os.scandir(path) as entries:
+        return sum(e.stat().st_size for e in entries if e.is_file())
+
+
+def container_size(container) -> int:
+    """Approximate memory footprint of a dict or list and its immediate items."""
+    size = sys.getsizeof(container)
+    values = list(container.values()) if isinstance(container, dict) else container
+    for value in values:
+        size += sys.getsizeof(value)
+        if isinstance(value, list):
+            size += sum(sys.getsizeof(v) for v in value)
+    return size
+
+
+# Detectors currently alive in this process, inspected at scrape time only
+active_detectors = weakref.WeakSet()
+
+
+def active_track_count() -> float:
+    """Number of tracks in the last processed frame of all active detectors."""
+    return float(
+        sum(len(getattr(d, "track_ids", ())) for d in list(active_detectors))
+    )
+
+
+def track_state_bytes() -> float:
+    """Approximate memory held by per-track state of all active detectors."""
+    total = 0
+    for detector in list(active_detectors):
+        for container in detector.track_state_containers():
+            total += container_size(container)
+    return float(total)
+
+
+REGISTRY = MetricsRegistry()
+
+FRAMES_TOTAL = REGISTRY.register(
+    Counter("traffic_frames_processed_total", "Frames processed by all detectors.")
+)
+FRAME_RATE = RateMeter()
+REGISTRY.register(
+    Gauge(
+        "traffic_frames_per_second",
+        "Frames processed during the last completed second.",
+        func=FRAME_RATE.rate,
+    )
+)
+STAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        "traffic_stage_seconds",
+        "Per-frame latency of each processing stage.",
+        label="stage",
+    )
+)
+REGISTRY.register(
+    Gauge(
+        "traffic_active_tracks",
+        "Tracks in the last processed frame of all active detectors.",
+        func=active_track_count,
+    )
+)
+REGISTRY.register(
+    Gauge(
+        "traffic_track_state_bytes",
+        "Approximate memory footprint of detector per-track state.",
+        func=track_state_bytes,
+    )
+)
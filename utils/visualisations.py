@@ -1,22 +1,24 @@
 from config.config_handler import DetectorConfig
 from models.enums import VehicleState
 from ultralytics.utils.plotting import Annotator, colors
-import torch
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Tuple
 import cv2
 
+if TYPE_CHECKING:
+    import torch
+
 
 def draw_box_label(
     track_id: int,
-    box: torch.Tensor,
+    box: "torch.Tensor",
     cls: float,
     speed: Dict[int, np.float32],
     names: Dict[int, str],
     baseline: Dict[int, VehicleState],
     annotator: Annotator,
     track_line: List[Tuple[float, float]],
-    track_directions: Dict[int, torch.Tensor],
+    track_directions: Dict[int, "torch.Tensor"],
     config: DetectorConfig,
 ):
 
@@ -52,3 +54,142 @@ def draw_box_label(
             colors(track_id, True),
             config.line_width,
         )
+
+
+class TrackRenderer:
+    """
+    Draws boxes, labels, track lines and direction arrows of all tracks in a
+    single pass over the frame.
+
+    Colors and label text are cached per track. Labels only change when the
+    track's speed or state is updated (every `write_every_n_frames` frames), so
+    their text and size are recomputed only then. With `config.annotation_scale`
+    below 1 the frame is downscaled first and drawing happens on the smaller
+    image.
+    """
+
+    TEXT_COLOR = (255, 255, 255)
+    PRUNE_EVERY_N_FRAMES = 300
+
+    def __init__(self, config: DetectorConfig, names: Dict[int, str]):
+        self.config = config
+        self.names = names
+        self.line_width = config.line_width
+        self.font_scale = self.line_width / 3
+        self.font_thickness = max(self.line_width - 1, 1)
+        self._colors: Dict[int, Tuple[int, int, int]] = {}
+        # track_id -> ((speed, state), label, (text width, text height))
+        self._labels: Dict[int, Tuple[Tuple, str, Tuple[int, int]]] = {}
+        self._frames = 0
+
+    def color(self, track_id: int) -> Tuple[int, int, int]:
+        track_color = self._colors.get(track_id)
+        if track_color is None:
+            track_color = self._colors[track_id] = colors(int(track_id), True)
+        return track_color
+
+    def label(
+        self,
+        track_id: int,
+        cls: float,
+        speed: Dict[int, np.float32],
+        baseline: Dict[int, VehicleState],
+    ) -> Tuple[str, Tuple[int, int]]:
+        key = (speed.get(track_id), baseline.get(track_id))
+        cached = self._labels.get(track_id)
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+
+        if track_id not in speed:
+            text = self.names[int(cls)]
+        elif self.config.do_analyze:
+            text = f"{baseline[track_id]} | {int(speed[track_id])} km/h"
+        else:
+            text = f"{int(speed[track_id])} km/h"
+        size, _ = cv2.getTextSize(
+            text, cv2.FONT_HERSHEY_SIMPLEX, self.font_scale, self.font_thickness
+        )
+        self._labels[track_id] = (key, text, size)
+        return text, size
+
+    def _prune(self, track_ids: List[int]) -> None:
+        active = set(track_ids)
+        self._colors = {k: v for k, v in self._colors.items() if k in active}
+        self._labels = {k: v for k, v in self._labels.items() if k in active}
+
+    def render(
+        self,
+        im0: np.ndarray,
+        track_ids: List[int],
+        boxes,
+        clss: List[float],
+        speed: Dict[int, np.float32],
+        baseline: Dict[int, VehicleState],
+        track_history: Dict[int, List[Tuple[float, float]]],
+        track_directions: Dict[int, float],
+    ) -> np.ndarray:
+        """
+        Draws all given tracks and returns the annotated frame.
+
+        The frame is annotated in place unless `annotation_scale` is below 1, in
+        which case a downscaled copy is annotated and returned.
+        """
+        scale = min(self.config.annotation_scale, 1.0)
+        im = im0
+        if scale < 1:
+            h, w = im0.shape[:2]
+            im = cv2.resize(
+                im0, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA
+            )
+
+        self._frames += 1
+        if self._frames % self.PRUNE_EVERY_N_FRAMES == 0:
+            self._prune(track_ids)
+
+        if not len(track_ids):
+            return im
+
+        coords = np.asarray(boxes, dtype=np.float32).reshape(-1, 4) * scale
+        coords = coords.astype(np.int32)
+        lw = self.line_width
+        for (x1, y1, x2, y2), track_id, cls in zip(coords.tolist(), track_ids, clss):
+            track_color = self.color(track_id)
+            text, (tw, th) = self.label(track_id, cls, speed, baseline)
+
+            cv2.rectangle(im, (x1, y1), (x2, y2), track_color, lw, cv2.LINE_AA)
+            outside = y1 >= th + 3
+            label_y2 = y1 - th - 3 if outside else y1 + th + 3
+            cv2.rectangle(
+                im, (x1, y1), (x1 + tw, label_y2), track_color, -1, cv2.LINE_AA
+            )
+            cv2.putText(
+                im,
+                text,
+                (x1, y1 - 2 if outside else y1 + th + 2),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                self.font_scale,
+                self.TEXT_COLOR,
+                self.font_thickness,
+                cv2.LINE_AA,
+            )
+
+            track_line = track_history.get(track_id)
+            if not track_line:
+                continue
+            points = np.asarray(track_line, dtype=np.float32) * scale
+            points = points.astype(np.int32)
+            center = tuple(points[-1].tolist())
+
+            if self.config.draw_tracks:
+                cv2.polylines(im, [points], False, track_color, lw)
+                cv2.circle(im, center, lw * 2, track_color, -1)
+
+            if self.config.draw_direction:
+                m = speed[track_id] if speed.get(track_id, 0) > 2 else 0
+                direction = track_directions.get(track_id, 0)
+                tip = (
+                    int(center[0] - m * scale * np.cos(direction)),
+                    int(center[1] - m * scale * np.sin(direction)),
+                )
+                cv2.arrowedLine(im, center, tip, track_color, lw)
+        return im